@@ -7,7 +7,6 @@ __author__ = "Jens Damm & Hans Bohn Svendsen"
 
 from pyrevit.output import get_output
 import clr
-import csv
 import os
 import time
 from datetime import datetime
@@ -15,11 +14,16 @@ from datetime import datetime
 clr.AddReference('System.Windows.Forms')
 clr.AddReference('System')
 
+from System import ArgumentException
+from System.Collections.Generic import List
+from System.IO import File, StreamWriter
+from System.Text import Encoding
 from System.Windows.Forms import (
     MessageBox, MessageBoxButtons, MessageBoxIcon, DialogResult, 
     SaveFileDialog
 )
 from Autodesk.Revit.DB import *
+from Autodesk.Revit.Exceptions import ApplicationException
 from Autodesk.Revit.UI import *
 
 # Global variables
@@ -31,30 +35,33 @@ def get_unit_type_millimeters():
     """Get the correct unit type for millimeters based on Revit version"""
     try:
         return UnitTypeId.Millimeters
-    except:
+    except NameError:
+        # UnitTypeId was introduced in Revit 2021, DisplayUnitType removed in 2022
         try:
             return DisplayUnitType.DUT_MILLIMETERS
-        except:
+        except NameError:
             return None
 
 def get_unit_type_square_meters():
     """Get the correct unit type for square meters based on Revit version"""
     try:
         return UnitTypeId.SquareMeters
-    except:
+    except NameError:
+        # UnitTypeId was introduced in Revit 2021, DisplayUnitType removed in 2022
         try:
             return DisplayUnitType.DUT_SQUARE_METERS
-        except:
+        except NameError:
             return None
 
 def get_unit_type_cubic_meters():
     """Get the correct unit type for cubic meters based on Revit version"""
     try:
         return UnitTypeId.CubicMeters
-    except:
+    except NameError:
+        # UnitTypeId was introduced in Revit 2021, DisplayUnitType removed in 2022
         try:
             return DisplayUnitType.DUT_CUBIC_METERS
-        except:
+        except NameError:
             return None
 
 def convert_from_internal_units(value, unit_type):
@@ -63,300 +70,499 @@ def convert_from_internal_units(value, unit_type):
         return value
     try:
         return UnitUtils.ConvertFromInternalUnits(value, unit_type)
-    except:
+    except (ApplicationException, ArgumentException):
         return value
 
+# Conversion factors from Revit's internal units (feet), computed once
+FEET_TO_MM = convert_from_internal_units(1.0, get_unit_type_millimeters())
+SQUARE_FEET_TO_M2 = convert_from_internal_units(1.0, get_unit_type_square_meters())
+CUBIC_FEET_TO_M3 = convert_from_internal_units(1.0, get_unit_type_cubic_meters())
+
+# Resolved BuiltInParameter tuples by parameter name tuple
+_builtin_params_cache = {}
+
 # Safe BuiltInParameter access
 def get_safe_builtin_params(param_names):
-    """Safely get BuiltInParameter values that exist in the current Revit version"""
-    safe_params = []
-    for param_name in param_names:
+    """Safely get BuiltInParameter values that exist in the current Revit version.
+    Resolved once per tuple of names, as the same lists are looked up for every element."""
+    safe_params = _builtin_params_cache.get(param_names)
+    if safe_params is None:
+        safe_params = []
+        for param_name in param_names:
+            try:
+                param_value = getattr(BuiltInParameter, param_name)
+                safe_params.append(param_value)
+            except AttributeError:
+                continue
+        safe_params = tuple(safe_params)
+        _builtin_params_cache[param_names] = safe_params
+    return safe_params
+
+# Safe BuiltInCategory access
+def get_safe_builtin_categories(category_names):
+    """Safely get BuiltInCategory values that exist in the current Revit version"""
+    safe_categories = []
+    for category_name in category_names:
         try:
-            param_value = getattr(BuiltInParameter, param_name)
-            safe_params.append(param_value)
+            safe_categories.append(getattr(BuiltInCategory, category_name))
         except AttributeError:
             continue
-    return safe_params
+    return safe_categories
 
 # Configuration constants
 class Config:
     DEFAULT_DECIMALS = 5
     CSV_DELIMITER = ';'
     PROGRESS_UPDATE_INTERVAL = 50
-    CSV_WRITE_INTERVAL = 500
-    @staticmethod
-    def get_timestamp():
-        return datetime.now().strftime("%Y%m%d %H%M")
+    PROGRESS_MIN_SECONDS = 0.2
+    CSV_BUFFER_SIZE = 1048576
+    CSV_WRITE_BATCH_SIZE = 500
+    FORMAT_NUMBER_CACHE_SIZE = 4096
+    # Built-in parameters that only exist on elements of a single category
+    CATEGORY_SPECIFIC_PARAMS = {
+        "DOOR_WIDTH": "OST_Doors", "DOOR_HEIGHT": "OST_Doors",
+        "WINDOW_WIDTH": "OST_Windows", "WINDOW_HEIGHT": "OST_Windows",
+        "WALL_USER_HEIGHT_PARAM": "OST_Walls", "WALL_ATTR_WIDTH_PARAM": "OST_Walls"
+    }
+    # Categories that get a placeholder record when no material is found
+    BASIC_RECORD_CATEGORIES = [
+        "OST_Walls", "OST_Floors", "OST_Roofs", "OST_Ceilings", "OST_StructuralFraming",
+        "OST_StructuralColumns", "OST_Doors", "OST_Windows", "OST_Furniture", "OST_Casework"
+    ]
+    # Timestamp appended to the default export file name
+    FILE_TIMESTAMP_FORMAT = "%Y%m%d %H%M"
+
+def get_model_category_ids(document):
+    """Get the ids of all model categories of a document, including their subcategories.
+    Annotation, analytical and internal categories are left out as they carry no materials."""
+    category_ids = List[ElementId]()
+    for category in document.Settings.Categories:
+        if category.CategoryType == CategoryType.Model:
+            category_ids.Add(category.Id)
+            for subcategory in category.SubCategories:
+                category_ids.Add(subcategory.Id)
+    return category_ids
+
+# Category ids that get a placeholder record, compared by id so it does not depend on the Revit language
+BASIC_RECORD_CATEGORY_IDS = frozenset(
+    int(category) for category in get_safe_builtin_categories(Config.BASIC_RECORD_CATEGORIES))
+
+def has_basic_record_category(element):
+    """Check if the element's category gets a placeholder record when no material is found"""
+    category = element.Category
+    return category is not None and category.Id.IntegerValue in BASIC_RECORD_CATEGORY_IDS
+
+# Host element classes with a WallType/FloorType/RoofType, checked with isinstance instead of hasattr probes
+LAYERED_HOST_CLASSES = (Wall, Floor, RoofBase)
+LAYER_VOLUME_CLASSES = (Wall, Floor)
+
+# Category id of each category specific built-in parameter
+CATEGORY_SPECIFIC_PARAM_IDS = dict(
+    (param_name, int(getattr(BuiltInCategory, category_name)))
+    for param_name, category_name in Config.CATEGORY_SPECIFIC_PARAMS.items()
+    if hasattr(BuiltInCategory, category_name))
+
+_category_param_names_cache = {}
 
-def safe_execution(default_return="N/A"):
-    """Decorator to handle exceptions and return default value"""
+def get_category_param_names(element, param_names):
+    """Filter built-in parameter names down to those that can exist on the element's category"""
+    category = element.Category
+    category_id = category.Id.IntegerValue if category else None
+    key = (category_id, param_names)
+    names = _category_param_names_cache.get(key)
+    if names is None:
+        names = tuple(name for name in param_names
+                      if CATEGORY_SPECIFIC_PARAM_IDS.get(name, category_id) == category_id)
+        _category_param_names_cache[key] = names
+    return names
+
+# Column order of the exported CSV; material records are tuples in this order
+CSV_COLUMNS = (
+    'ElementId', 'ElementCategory', 'ExportGUID', 'FamilyName', 'FamilyType', 'Type', 'TypeId',
+    'Width_mm', 'Height_mm', 'LayerIndex',
+    'MaterialId', 'MaterialName', 'MaterialClass',
+    'Thickness_mm', 'MaterialVolume_m3', 'MaterialArea_m2',
+    'ElementTotalVolume_m3', 'ElementTotalArea_m2'
+)
+
+# Per-export lookup caches, keyed by ElementId.IntegerValue
+_element_cache = {}
+_type_names_cache = {}
+_type_material_ids_cache = {}
+_compound_layers_cache = {}
+_type_layers_cache = {}
+_type_layer_thickness_cache = {}
+_material_info_cache = {}
+_category_name_cache = {}
+_category_material_cache = {}
+_format_number_cache = {}
+_layer_columns_cache = {}
+_type_parameter_cache = {}
+
+def clear_caches():
+    """Reset the lookup caches so values never outlive a single export"""
+    _element_cache.clear()
+    _type_names_cache.clear()
+    _type_material_ids_cache.clear()
+    _compound_layers_cache.clear()
+    _type_layers_cache.clear()
+    _type_layer_thickness_cache.clear()
+    _material_info_cache.clear()
+    _category_name_cache.clear()
+    _category_material_cache.clear()
+    _format_number_cache.clear()
+    _layer_columns_cache.clear()
+    _type_parameter_cache.clear()
+
+def index_elements(elements):
+    """Index elements by their id value"""
+    return {element.Id.IntegerValue: element for element in elements}
+
+def prefetch_elements(elements):
+    """Add already resolved elements, e.g. from a batch collector, to the element cache"""
+    _element_cache.update(index_elements(elements))
+
+def get_cached_element(element_id):
+    """Get an element by id, using the prefetched elements when available"""
+    key = element_id.IntegerValue
+    if key in _element_cache:
+        return _element_cache[key]
+    element = doc.GetElement(element_id)
+    _element_cache[key] = element
+    return element
+
+def get_element_type(type_id):
+    """Get a type element by its id value, None for elements without a type"""
+    if type_id in _element_cache:
+        return _element_cache[type_id]
+    if type_id == -1:
+        return None
+    return get_cached_element(ElementId(type_id))
+
+def cached_per_type(cache):
+    """Decorator to cache a per-element lookup by the element's type id value.
+    The decorated function is called with the element and its type id value."""
     def decorator(func):
-        def wrapper(*args, **kwargs):
-            try:
-                return func(*args, **kwargs)
-            except:
-                return default_return
+        def wrapper(element, type_id):
+            if type_id == -1:
+                return func(element, type_id)
+            if type_id not in cache:
+                cache[type_id] = func(element, type_id)
+            return cache[type_id]
         return wrapper
     return decorator
 
-def format_number(value, decimals=Config.DEFAULT_DECIMALS):
-    """Format a number to a specific number of decimal places, removing trailing zeros"""
-    if value == "N/A" or value is None:
-        return "N/A"
-    try:
-        formatted = "{:.{}f}".format(float(value), decimals)
-        formatted = formatted.rstrip('0').rstrip('.')
-        if formatted == "":
-            formatted = "0"
-        formatted = formatted.replace('.', ',')
-        return formatted
-    except:
-        return "N/A"
+def get_category_name(element):
+    """Get the category name of an element, cached per category"""
+    category = element.Category
+    if not category:
+        return "Unknown"
+    category_id = category.Id.IntegerValue
+    name = _category_name_cache.get(category_id)
+    if name is None:
+        name = category.Name
+        _category_name_cache[category_id] = name
+    return name
 
-def get_category_material_info(element):
-    """Get material information from element's category"""
+def get_material_info(material_id_value):
+    """Get (name, material class) for a material id value, cached per material.
+    Returns None if the material does not exist."""
+    if material_id_value in _material_info_cache:
+        return _material_info_cache[material_id_value]
+    material = get_cached_element(ElementId(material_id_value))
+    if material:
+        info = (material.Name, getattr(material, 'MaterialClass', 'Unknown'))
+    else:
+        info = None
+    _material_info_cache[material_id_value] = info
+    return info
+
+def parse_number(value):
+    """Parse a number that may already be formatted with a decimal comma.
+    Returns None if the value is not numeric."""
+    if value is None or value == "N/A":
+        return None
+    if isinstance(value, str):
+        value = value.replace(',', '.')
     try:
-        if element.Category:
-            category = element.Category
-            material = category.Material
-            if material:
-                return {
-                    'material_id': material.Id.IntegerValue,
-                    'material_name': material.Name,
-                    'material_class': getattr(material, 'MaterialClass', 'Unknown')
-                }
+        return float(value)
+    except (TypeError, ValueError):
         return None
-    except:
+
+def format_number(value, decimals=Config.DEFAULT_DECIMALS):
+    """Format a number to a specific number of decimal places, removing trailing zeros.
+    Results are cached by the raw value as the same values repeat across layers and elements.
+    The cache is emptied once it holds Config.FORMAT_NUMBER_CACHE_SIZE values, as per-element
+    areas and volumes are mostly unique and would otherwise grow it with the model."""
+    key = (value, decimals)
+    formatted = _format_number_cache.get(key)
+    if formatted is None:
+        number = parse_number(value)
+        if number is None:
+            formatted = "N/A"
+        else:
+            formatted = ('%.*f' % (decimals, number)).rstrip('0').rstrip('.') or "0"
+            formatted = formatted.replace('.', ',')
+        if len(_format_number_cache) >= Config.FORMAT_NUMBER_CACHE_SIZE:
+            _format_number_cache.clear()
+        _format_number_cache[key] = formatted
+    return formatted
+
+def get_category_material_info(element):
+    """Get material information from element's category, cached per category"""
+    category = element.Category
+    if category is None:
         return None
+    category_id = category.Id.IntegerValue
+    if category_id in _category_material_cache:
+        return _category_material_cache[category_id]
+    material = category.Material
+    if material is None:
+        info = None
+    else:
+        material_name, material_class = get_material_info(material.Id.IntegerValue) or (material.Name, 'Unknown')
+        info = {
+            'material_id': material.Id.IntegerValue,
+            'material_name': material_name,
+            'material_class': material_class
+        }
+    _category_material_cache[category_id] = info
+    return info
+
+# Marks a parameter search that found no parameter with a value
+NO_VALUE = object()
+
+def read_parameter_value(param, unit_factor):
+    """Read a parameter's value, converting doubles from internal units with unit_factor"""
+    if unit_factor:
+        return format_number(param.AsDouble() * unit_factor)
+    return param.AsString() or param.AsValueString()
 
-def get_parameter_value_comprehensive(element, builtin_param_names, unit_type=None, fallback_param_names=None):
-    """Comprehensive parameter value retrieval with multiple fallback methods"""
+def find_builtin_parameter_value(source, builtin_params, unit_factor):
+    """Get the value of the first built-in parameter with a value, or NO_VALUE"""
+    for builtin_param in builtin_params:
+        param = source.get_Parameter(builtin_param)
+        if param is not None and param.HasValue:
+            return read_parameter_value(param, unit_factor)
+    return NO_VALUE
+
+def find_named_parameter_value(source, param_names, unit_factor):
+    """Get the value of the first parameter looked up by name with a value, or NO_VALUE"""
+    for param_name in param_names:
+        param = source.LookupParameter(param_name)
+        if param is not None and param.HasValue:
+            return read_parameter_value(param, unit_factor)
+    return NO_VALUE
+
+def get_type_parameter_values(type_id, builtin_param_names, unit_factor, fallback_param_names):
+    """Get the built-in and by-name parameter values of a type by its id value.
+    Cached per type, as all instances of a type share the same type parameters."""
+    key = (type_id, builtin_param_names, unit_factor, fallback_param_names)
+    values = _type_parameter_cache.get(key)
+    if values is None:
+        element_type = get_element_type(type_id)
+        if element_type:
+            values = (
+                find_builtin_parameter_value(element_type, get_safe_builtin_params(builtin_param_names), unit_factor),
+                find_named_parameter_value(element_type, fallback_param_names or (), unit_factor)
+            )
+        else:
+            values = (NO_VALUE, NO_VALUE)
+        if type_id != -1:
+            _type_parameter_cache[key] = values
+    return values
+
+def get_parameter_value_comprehensive(element, type_id, builtin_param_names, unit_factor=None, fallback_param_names=None):
+    """Comprehensive parameter value retrieval with multiple fallback methods.
+    Double values are converted from internal units by multiplying with unit_factor.
+    Parameter names are passed as tuples so their resolution can be cached.
+    type_id is the id value of the element's type, as resolved once per element."""
     try:
         # Method 1: Try safe BuiltInParameters
-        safe_builtin_params = get_safe_builtin_params(builtin_param_names)
-        for builtin_param in safe_builtin_params:
-            try:
-                param = element.get_Parameter(builtin_param)
-                if param and param.HasValue:
-                    if unit_type:
-                        value = param.AsDouble()
-                        value = convert_from_internal_units(value, unit_type)
-                        return format_number(value, Config.DEFAULT_DECIMALS)
-                    else:
-                        return param.AsString() or param.AsValueString()
-            except:
-                continue
+        value = find_builtin_parameter_value(element, get_safe_builtin_params(builtin_param_names), unit_factor)
+        if value is not NO_VALUE:
+            return value
         
         # Method 2: Try type parameters with BuiltInParameters
-        element_type = doc.GetElement(element.GetTypeId())
-        if element_type:
-            for builtin_param in safe_builtin_params:
-                try:
-                    param = element_type.get_Parameter(builtin_param)
-                    if param and param.HasValue:
-                        if unit_type:
-                            value = param.AsDouble()
-                            value = convert_from_internal_units(value, unit_type)
-                            return format_number(value, Config.DEFAULT_DECIMALS)
-                        else:
-                            return param.AsString() or param.AsValueString()
-                except:
-                    continue
+        type_builtin_value, type_named_value = get_type_parameter_values(
+            type_id, builtin_param_names, unit_factor, fallback_param_names)
+        if type_builtin_value is not NO_VALUE:
+            return type_builtin_value
         
-        # Method 3: Try string parameter lookup (instance)
         if fallback_param_names:
-            for param_name in fallback_param_names:
-                try:
-                    param = element.LookupParameter(param_name)
-                    if param and param.HasValue:
-                        if unit_type:
-                            value = param.AsDouble()
-                            value = convert_from_internal_units(value, unit_type)
-                            return format_number(value, Config.DEFAULT_DECIMALS)
-                        else:
-                            return param.AsString() or param.AsValueString()
-                except:
-                    continue
+            # Method 3: Try string parameter lookup (instance)
+            value = find_named_parameter_value(element, fallback_param_names, unit_factor)
+            if value is not NO_VALUE:
+                return value
             
             # Method 4: Try string parameter lookup (type)
-            if element_type:
-                for param_name in fallback_param_names:
-                    try:
-                        param = element_type.LookupParameter(param_name)
-                        if param and param.HasValue:
-                            if unit_type:
-                                value = param.AsDouble()
-                                value = convert_from_internal_units(value, unit_type)
-                                return format_number(value, Config.DEFAULT_DECIMALS)
-                            else:
-                                return param.AsString() or param.AsValueString()
-                    except:
-                        continue
+            if type_named_value is not NO_VALUE:
+                return type_named_value
         
         return "N/A"
-    except:
+    except (ApplicationException, AttributeError):
         return "N/A"
 
-def get_element_area_robust(element):
-    """Get area with multiple fallback methods"""
+# Lowercase parameter names scanned by the last area/volume fallback
+AREA_PARAMETER_NAMES = frozenset(['area', 'surface area', 'gross area', 'net area'])
+VOLUME_PARAMETER_NAMES = frozenset(['volume', 'gross volume', 'net volume'])
+
+def find_positive_double_value(element, param_names, unit_factor):
+    """Get the first positive double value among the element's parameters whose lowercase
+    name is in param_names, or NO_VALUE. Names are compared ignoring case, so shared
+    parameters such as "Net area" are found as well."""
     try:
-        # Method 1: Try comprehensive parameter search
-        area_result = get_parameter_value_comprehensive(
-            element,
-            ["HOST_AREA_COMPUTED", "ROOM_AREA"],
-            get_unit_type_square_meters(),
-            ["Area", "Gross Surface Area", "Net Surface Area"]
-        )
-        
-        if area_result != "N/A":
-            return area_result
-        
-        # Method 2: Direct parameter access for common elements
-        try:
-            if hasattr(element, 'WallType') or hasattr(element, 'FloorType') or hasattr(element, 'RoofType'):
-                # Try to get area parameter directly
-                area_param = element.LookupParameter("Area")
-                if area_param and area_param.HasValue:
-                    area_sqft = area_param.AsDouble()
-                    area_sqm = convert_from_internal_units(area_sqft, get_unit_type_square_meters())
-                    return format_number(area_sqm)
-        except:
-            pass
-        
-        # Method 3: Try all parameters to find area-related ones
-        try:
-            for param in element.Parameters:
-                if param.Definition.Name.lower() in ['area', 'surface area', 'gross area', 'net area']:
-                    if param.HasValue and param.StorageType == StorageType.Double:
-                        value = param.AsDouble()
-                        if value > 0:  # Only positive areas make sense
-                            area_sqm = convert_from_internal_units(value, get_unit_type_square_meters())
-                            return format_number(area_sqm)
-        except:
-            pass
-        
-        return "N/A"
-    except:
-        return "N/A"
+        for param in element.Parameters:
+            if param.Definition.Name.lower() in param_names:
+                if param.HasValue and param.StorageType == StorageType.Double:
+                    value = param.AsDouble()
+                    if value > 0:
+                        return format_number(value * unit_factor)
+    except ApplicationException:
+        pass
+    return NO_VALUE
 
-def get_element_volume_robust(element):
+def get_element_area_robust(element, type_id):
+    """Get area with multiple fallback methods"""
+    # Method 1: Try comprehensive parameter search
+    area_result = get_parameter_value_comprehensive(
+        element,
+        type_id,
+        ("HOST_AREA_COMPUTED",),
+        SQUARE_FEET_TO_M2,
+        ("Area", "Gross Surface Area", "Net Surface Area")
+    )
+    
+    if area_result != "N/A":
+        return area_result
+    
+    # Method 2: Try the other area-related parameters, only positive areas make sense
+    area_result = find_positive_double_value(
+        element, AREA_PARAMETER_NAMES, SQUARE_FEET_TO_M2)
+    return area_result if area_result is not NO_VALUE else "N/A"
+
+def get_element_volume_robust(element, type_id):
     """Get volume with multiple fallback methods"""
-    try:
-        # Method 1: Try comprehensive parameter search
-        volume_result = get_parameter_value_comprehensive(
-            element,
-            ["HOST_VOLUME_COMPUTED", "ROOM_VOLUME"],
-            get_unit_type_cubic_meters(),
-            ["Volume", "Gross Volume", "Net Volume"]
-        )
-        
-        if volume_result != "N/A":
-            return volume_result
-        
-        # Method 2: Direct parameter access
-        try:
-            volume_param = element.LookupParameter("Volume")
-            if volume_param and volume_param.HasValue:
-                volume_cuft = volume_param.AsDouble()
-                volume_cum = convert_from_internal_units(volume_cuft, get_unit_type_cubic_meters())
-                return format_number(volume_cum)
-        except:
-            pass
-        
-        # Method 3: Try all parameters to find volume-related ones
-        try:
-            for param in element.Parameters:
-                if param.Definition.Name.lower() in ['volume', 'gross volume', 'net volume']:
-                    if param.HasValue and param.StorageType == StorageType.Double:
-                        value = param.AsDouble()
-                        if value > 0:  # Only positive volumes make sense
-                            volume_cum = convert_from_internal_units(value, get_unit_type_cubic_meters())
-                            return format_number(volume_cum)
-        except:
-            pass
-        
-        return "N/A"
-    except:
-        return "N/A"
+    # Method 1: Try comprehensive parameter search
+    volume_result = get_parameter_value_comprehensive(
+        element,
+        type_id,
+        ("HOST_VOLUME_COMPUTED",),
+        CUBIC_FEET_TO_M3,
+        ("Volume", "Gross Volume", "Net Volume")
+    )
+    
+    if volume_result != "N/A":
+        return volume_result
+    
+    # Method 2: Try the other volume-related parameters, only positive volumes make sense
+    volume_result = find_positive_double_value(
+        element, VOLUME_PARAMETER_NAMES, CUBIC_FEET_TO_M3)
+    return volume_result if volume_result is not NO_VALUE else "N/A"
 
-def get_element_width(element):
+def get_element_width(element, type_id):
     """Get Width parameter from element using comprehensive search"""
     return get_parameter_value_comprehensive(
         element,
-        ["DOOR_WIDTH", "WINDOW_WIDTH", "GENERIC_WIDTH", "FAMILY_WIDTH_PARAM"],
-        get_unit_type_millimeters(),
-        ["Width", "Rough Width", "Opening Width"]
+        type_id,
+        get_category_param_names(element, ("DOOR_WIDTH", "WINDOW_WIDTH", "GENERIC_WIDTH", "FAMILY_WIDTH_PARAM")),
+        FEET_TO_MM,
+        ("Width", "Rough Width", "Opening Width")
     )
 
-def get_element_height(element):
+def get_element_height(element, type_id):
     """Get Height parameter from element using comprehensive search"""
     return get_parameter_value_comprehensive(
         element,
-        ["DOOR_HEIGHT", "WINDOW_HEIGHT", "GENERIC_HEIGHT", "FAMILY_HEIGHT_PARAM", "WALL_USER_HEIGHT_PARAM"],
-        get_unit_type_millimeters(),
-        ["Height", "Rough Height", "Opening Height", "Unconnected Height"]
+        type_id,
+        get_category_param_names(
+            element, ("DOOR_HEIGHT", "WINDOW_HEIGHT", "GENERIC_HEIGHT", "FAMILY_HEIGHT_PARAM", "WALL_USER_HEIGHT_PARAM")),
+        FEET_TO_MM,
+        ("Height", "Rough Height", "Opening Height", "Unconnected Height")
     )
 
-def get_element_thickness(element):
+def get_element_thickness(element, type_id):
     """Get Thickness parameter from element using comprehensive search"""
     return get_parameter_value_comprehensive(
         element,
-        ["WALL_ATTR_WIDTH_PARAM", "GENERIC_THICKNESS", "FAMILY_THICKNESS_PARAM"],
-        get_unit_type_millimeters(),
-        ["Thickness", "Width"]
+        type_id,
+        get_category_param_names(element, ("WALL_ATTR_WIDTH_PARAM", "GENERIC_THICKNESS", "FAMILY_THICKNESS_PARAM")),
+        FEET_TO_MM,
+        ("Thickness", "Width")
     )
 
-@safe_execution()
 def get_export_guid(element):
     """Get export GUID for element"""
     try:
         guid_str = ExportUtils.GetExportId(doc, element.Id)
-        return str(guid_str) if guid_str else "N/A"
-    except:
+    except ApplicationException:
         return "N/A"
+    return str(guid_str) if guid_str else "N/A"
+
+@cached_per_type(_compound_layers_cache)
+def get_type_compound_layers(element, type_id):
+    """Get the compound structure layers of an element's type as (material id, width in feet) tuples.
+    Returns an empty list for types that are not a HostObjAttributes, such as family symbols,
+    and None if the type supports a compound structure but has none."""
+    element_type = get_element_type(type_id)
+    if not isinstance(element_type, HostObjAttributes):
+        return []
+    cs = element_type.GetCompoundStructure()
+    if not cs:
+        return None
+    return [(layer.MaterialId, layer.Width) for layer in cs.GetLayers()]
+
+@cached_per_type(_type_layers_cache)
+def get_type_layers(element, type_id):
+    """Get the layer info of an element's compound structure, including enhanced 'By Category' handling.
+    Built once per type and shared by all its elements, so the result must not be modified.
+    Returns None if the type supports a compound structure but has none."""
+    compound_layers = get_type_compound_layers(element, type_id)
+    if compound_layers is None:
+        return None
+    layers = []
+    for i, (mat_id, width) in enumerate(compound_layers):
+        thickness_mm = round(width * FEET_TO_MM, 2)
+        if mat_id == ElementId.InvalidElementId:
+            # Enhanced "By Category" handling; elements share their type's category
+            category_material = get_category_material_info(element)
+            if category_material:
+                mat_name = "By Category: {}".format(category_material['material_name'])
+                mat_id_for_export = "ByCategory_{}".format(category_material['material_id'])
+            else:
+                mat_name = "By Category: {}".format(get_category_name(element))
+                mat_id_for_export = "ByCategory_Unknown"
+        else:
+            mat_info = get_material_info(mat_id.IntegerValue)
+            mat_name = mat_info[0] if mat_info else "Unknown Material"
+            mat_id_for_export = mat_id.IntegerValue
+        
+        layers.append({
+            "LayerIndex": i,
+            "MaterialId": mat_id_for_export,
+            "MaterialName": mat_name,
+            "Thickness_mm": thickness_mm
+        })
+    return layers
 
-def get_material_layers(element):
-    """Returns all layers with material + thickness, including enhanced 'By Category' handling"""
+def get_material_layers(element, type_id):
+    """Returns all layers with material + thickness, including enhanced 'By Category' handling.
+    Elements whose type is not a HostObjAttributes get no layers, decided once per type."""
     results = []
     try:
-        element_type = doc.GetElement(element.GetTypeId())
-        if hasattr(element_type, 'GetCompoundStructure'):
-            cs = element_type.GetCompoundStructure()
-            if cs:
-                layers = cs.GetLayers()
-                for i, layer in enumerate(layers):
-                    mat_id = layer.MaterialId
-                    if mat_id == ElementId.InvalidElementId:
-                        # Enhanced "By Category" handling
-                        category_material = get_category_material_info(element)
-                        if category_material:
-                            mat_name = "By Category: {}".format(category_material['material_name'])
-                            mat_id_for_export = "ByCategory_{}".format(category_material['material_id'])
-                        else:
-                            mat_name = "By Category: {}".format(element.Category.Name)
-                            mat_id_for_export = "ByCategory_Unknown"
-                    else:
-                        mat = doc.GetElement(mat_id)
-                        mat_name = mat.Name if mat else "Unknown Material"
-                        mat_id_for_export = mat_id.IntegerValue
-                    
-                    thickness_mm = convert_from_internal_units(layer.Width, get_unit_type_millimeters())
-                    results.append({
-                        "LayerIndex": i,
-                        "MaterialId": mat_id_for_export,
-                        "MaterialName": mat_name,
-                        "Thickness_mm": round(thickness_mm, 2)
-                    })
-            else:
-                # Try to get thickness using comprehensive search
-                thickness = get_element_thickness(element)
-                if thickness != "N/A":
-                    results.append({
-                        "LayerIndex": 0,
-                        "MaterialId": "N/A",
-                        "MaterialName": "N/A",
-                        "Thickness_mm": thickness
-                    })
+        layers = get_type_layers(element, type_id)
+        if layers is None:
+            # Try to get thickness using comprehensive search
+            thickness = get_element_thickness(element, type_id)
+            if thickness != "N/A":
+                results.append({
+                    "LayerIndex": 0,
+                    "MaterialId": "N/A",
+                    "MaterialName": "N/A",
+                    "Thickness_mm": thickness
+                })
+        else:
+            results = layers
     except Exception as e:
         results.append({
             "LayerIndex": -1,
@@ -366,209 +572,148 @@ def get_material_layers(element):
         })
     return results
 
-def get_element_type_name(element):
+@cached_per_type(_type_names_cache)
+def get_type_names(element, type_id):
+    """Get the family name, family type and type name of an element, resolved once per type"""
+    return (get_family_name(element, type_id), get_family_type(element, type_id),
+            get_element_type_name(element, type_id))
+
+def get_element_type_name(element, type_id):
     """Get the element type name using comprehensive search"""
-    try:
-        # Try comprehensive parameter search first
-        type_name = get_parameter_value_comprehensive(
-            element,
-            ["ELEM_TYPE_PARAM", "SYMBOL_NAME_PARAM"],
-            None,
-            ["Type Name", "Family and Type", "Type"]
-        )
-        
-        if type_name != "N/A":
-            return type_name
-        
-        # Fallback to element type access
-        type_id = element.GetTypeId()
-        if type_id == ElementId.InvalidElementId:
-            return "No TypeId"
-        element_type = doc.GetElement(type_id)
-        if element_type:
-            if hasattr(element_type, 'Name'):
-                name = element_type.Name
-                if name and name.strip():
-                    return name
-            if hasattr(element_type, 'get_Name'):
-                try:
-                    name = element_type.get_Name()
-                    if name and name.strip():
-                        return name
-                except:
-                    pass
-            try:
-                if element_type.Category:
-                    return "{} - ID {}".format(element_type.Category.Name, element_type.Id.IntegerValue)
-                else:
-                    return "Type ID {}".format(element_type.Id.IntegerValue)
-            except:
-                pass
-        
-        # Additional fallbacks
-        if hasattr(element, 'Symbol') and element.Symbol:
-            return element.Symbol.Name
-        elif hasattr(element, 'WallType') and element.WallType:
-            return element.WallType.Name
-        elif hasattr(element, 'FloorType') and element.FloorType:
-            return element.FloorType.Name
-        elif hasattr(element, 'RoofType') and element.RoofType:
-            return element.RoofType.Name
-        return "No type found"
-    except Exception as e:
-        return "Exception: {}".format(str(e))
+    # Try comprehensive parameter search first
+    type_name = get_parameter_value_comprehensive(
+        element,
+        type_id,
+        ("ELEM_TYPE_PARAM", "SYMBOL_NAME_PARAM"),
+        None,
+        ("Type Name", "Family and Type", "Type")
+    )
+    
+    if type_name != "N/A":
+        return type_name
+    
+    # Fallback to element type access
+    if type_id == -1:
+        return "No TypeId"
+    element_type = get_element_type(type_id)
+    if element_type:
+        name = getattr(element_type, 'Name', None)
+        if name and name.strip():
+            return name
+        if element_type.Category:
+            return "{} - ID {}".format(get_category_name(element_type), element_type.Id.IntegerValue)
+        return "Type ID {}".format(element_type.Id.IntegerValue)
+    
+    # Additional fallbacks
+    for type_attr in ('Symbol', 'WallType', 'FloorType', 'RoofType'):
+        host_type = getattr(element, type_attr, None)
+        if host_type:
+            return host_type.Name
+    return "No type found"
 
-def get_family_name(element):
+def get_family_name(element, type_id):
     """Get family name from element using comprehensive search"""
-    try:
-        # Try comprehensive parameter search first
-        family_name = get_parameter_value_comprehensive(
-            element,
-            ["ELEM_FAMILY_PARAM", "SYMBOL_FAMILY_NAME_PARAM"],
-            None,
-            ["Family", "Family Name"]
-        )
-        
-        if family_name != "N/A":
-            return family_name
-        
-        # Fallback methods
-        if hasattr(element, 'Symbol') and element.Symbol:
-            return element.Symbol.Family.Name
-        elif hasattr(element, 'WallType'):
-            return "Wall"
-        elif hasattr(element, 'FloorType'):
-            return "Floor"
-        elif hasattr(element, 'RoofType'):
-            return "Roof"
-        else:
-            return element.Category.Name if element.Category else "Unknown"
-    except:
-        return "Unknown"
+    # Try comprehensive parameter search first
+    family_name = get_parameter_value_comprehensive(
+        element,
+        type_id,
+        ("ELEM_FAMILY_PARAM", "SYMBOL_FAMILY_NAME_PARAM"),
+        None,
+        ("Family", "Family Name")
+    )
+    
+    if family_name != "N/A":
+        return family_name
+    
+    # Fallback methods
+    symbol = getattr(element, 'Symbol', None)
+    if symbol:
+        return symbol.Family.Name
+    elif isinstance(element, Wall):
+        return "Wall"
+    elif isinstance(element, Floor):
+        return "Floor"
+    elif isinstance(element, RoofBase):
+        return "Roof"
+    return get_category_name(element)
 
-def get_family_type(element):
+def get_family_type(element, type_id):
     """Get family type name from element using comprehensive search"""
-    try:
-        # Try comprehensive parameter search first
-        family_type = get_parameter_value_comprehensive(
-            element,
-            ["ELEM_FAMILY_AND_TYPE_PARAM", "SYMBOL_FAMILY_AND_TYPE_NAMES_PARAM"],
-            None,
-            ["Family and Type", "Type"]
-        )
-        
-        if family_type != "N/A":
-            return family_type
-        
-        # Fallback methods
-        if hasattr(element, 'Symbol') and element.Symbol:
-            return element.Symbol.Name
-        elif hasattr(element, 'WallType'):
-            return element.WallType.Name
-        elif hasattr(element, 'FloorType'):
-            return element.FloorType.Name
-        elif hasattr(element, 'RoofType'):
-            return element.RoofType.Name
-        else:
-            element_type = doc.GetElement(element.GetTypeId())
-            return element_type.Name if element_type else "Unknown"
-    except:
-        return "Unknown"
+    # Try comprehensive parameter search first
+    family_type = get_parameter_value_comprehensive(
+        element,
+        type_id,
+        ("ELEM_FAMILY_AND_TYPE_PARAM", "SYMBOL_FAMILY_AND_TYPE_NAMES_PARAM"),
+        None,
+        ("Family and Type", "Type")
+    )
+    
+    if family_type != "N/A":
+        return family_type
+    
+    # Fallback methods
+    for type_attr in ('Symbol', 'WallType', 'FloorType', 'RoofType'):
+        host_type = getattr(element, type_attr, None)
+        if host_type:
+            return host_type.Name
+    element_type = get_element_type(type_id)
+    return element_type.Name if element_type else "Unknown"
 
-def get_element_material_ids(element):
-    """Get all material IDs used in an element"""
+@cached_per_type(_type_material_ids_cache)
+def get_type_layer_material_ids(element, type_id):
+    """Get the material IDs of the compound structure layers of an element's type"""
     material_ids = []
+    if isinstance(element, LAYERED_HOST_CLASSES):
+        for mat_id, width in get_type_compound_layers(element, type_id) or []:
+            if mat_id != ElementId.InvalidElementId:
+                material_ids.append(mat_id)
+    return material_ids
+
+def get_element_material_ids(element, type_id):
+    """Get all material IDs used in an element"""
     try:
-        if hasattr(element, 'WallType') or hasattr(element, 'FloorType') or hasattr(element, 'RoofType'):
-            element_type = doc.GetElement(element.GetTypeId())
-            if hasattr(element_type, 'GetCompoundStructure'):
-                compound_structure = element_type.GetCompoundStructure()
-                if compound_structure:
-                    layers = compound_structure.GetLayers()
-                    for layer in layers:
-                        if layer.MaterialId != ElementId.InvalidElementId:
-                            material_ids.append(layer.MaterialId)
-        try:
-            element_material_ids = element.GetMaterialIds(False)
-            material_ids.extend(element_material_ids)
-        except:
-            pass
-        valid_ids = []
+        element_material_ids = element.GetMaterialIds(False)
+    except ApplicationException:
+        # Still return the type layer materials if the element's own materials can't be read
+        element_material_ids = ()
+    valid_ids = []
+    seen = set()
+    for material_ids in (get_type_layer_material_ids(element, type_id), element_material_ids):
         for mat_id in material_ids:
-            if mat_id != ElementId.InvalidElementId and mat_id not in valid_ids:
+            id_value = mat_id.IntegerValue
+            if id_value != -1 and id_value not in seen:
+                seen.add(id_value)
                 valid_ids.append(mat_id)
-        return valid_ids
-    except:
-        return []
+    return valid_ids
 
-def get_material_thickness(element, material_id):
-    """Get thickness of specific material in element"""
-    try:
-        element_type = doc.GetElement(element.GetTypeId())
-        if hasattr(element_type, 'GetCompoundStructure'):
-            compound_structure = element_type.GetCompoundStructure()
-            if compound_structure:
-                layers = compound_structure.GetLayers()
-                for layer in layers:
-                    if layer.MaterialId == material_id:
-                        thickness_feet = layer.Width
-                        thickness_mm = convert_from_internal_units(thickness_feet, get_unit_type_millimeters())
-                        return round(thickness_mm, 5)
-        
-        # Use comprehensive thickness search
-        thickness = get_element_thickness(element)
-        return thickness if thickness != "N/A" else "N/A"
-    except:
-        return "N/A"
+@cached_per_type(_type_layer_thickness_cache)
+def get_type_layer_thicknesses(element, type_id):
+    """Get the thickness in mm of the first layer of each material in an element's type"""
+    thicknesses = {}
+    for layer_material_id, width in get_type_compound_layers(element, type_id) or []:
+        id_value = layer_material_id.IntegerValue
+        if id_value not in thicknesses:
+            thicknesses[id_value] = round(width * FEET_TO_MM, 5)
+    return thicknesses
 
-def calculate_layer_volume(element, thickness_mm):
-    """Calculate volume for a specific layer thickness"""
-    try:
-        if hasattr(element, 'WallType') or hasattr(element, 'FloorType'):
-            # Use robust area calculation
-            area_str = get_element_area_robust(element)
-            if area_str != "N/A" and thickness_mm != "N/A":
-                try:
-                    area_sqm = float(str(area_str).replace(',', '.'))
-                    thickness_m = float(thickness_mm) / 1000.0  # Convert mm to m
-                    volume_cum = area_sqm * thickness_m
-                    return round(volume_cum, 5)
-                except:
-                    pass
-        return "N/A"
-    except:
-        return "N/A"
+def get_material_thickness(element, type_id, material_id):
+    """Get thickness of specific material in element"""
+    thickness = get_type_layer_thicknesses(element, type_id).get(material_id.IntegerValue)
+    if thickness is not None:
+        return thickness
+    
+    # Use comprehensive thickness search
+    return get_element_thickness(element, type_id)
 
-def calculate_material_volume(element, material_id, thickness):
-    """Calculate volume of specific material in element"""
-    try:
-        if hasattr(element, 'WallType') or hasattr(element, 'FloorType'):
-            area_str = get_element_area_robust(element)
-            if area_str != "N/A" and thickness != "N/A":
-                try:
-                    area_sqm = float(str(area_str).replace(',', '.'))
-                    thickness_m = float(thickness) / 1000.0  # Convert mm to m
-                    volume_cum = area_sqm * thickness_m
-                    return round(volume_cum, 5)
-                except:
-                    pass
-        
-        # Fallback to element volume
-        volume_str = get_element_volume_robust(element)
-        if volume_str != "N/A":
-            return volume_str
-        
+def calculate_layer_volume(element, thickness_mm, area_sqm):
+    """Calculate volume for a specific layer thickness from the element area in m2"""
+    if not isinstance(element, LAYER_VOLUME_CLASSES):
         return "N/A"
-    except:
-        return "N/A"
-
-def calculate_material_area(element, material_id):
-    """Calculate area of specific material in element"""
-    try:
-        area_str = get_element_area_robust(element)
-        return area_str if area_str != "N/A" else "N/A"
-    except:
+    thickness = parse_number(thickness_mm)
+    if area_sqm is None or thickness is None:
         return "N/A"
+    thickness_m = thickness / 1000.0  # Convert mm to m
+    return round(area_sqm * thickness_m, 5)
 
 class MaterialDataExtractor:
     """Class to handle material data extraction with progress tracking"""
@@ -577,6 +722,8 @@ class MaterialDataExtractor:
         self.output = output_window
         self.processed_elements = 0
         self.material_records = 0
+        self.reported_decile = -1
+        self.last_progress_time = 0.0
         self.debug_info = {
             'total_elements': 0,
             'elements_with_category': 0,
@@ -589,27 +736,47 @@ class MaterialDataExtractor:
             'by_category_materials': 0
         }
 
-    def extract_all_materials(self):
-        """Extract comprehensive material data from all elements"""
+    def extract_all_materials(self, sink=None):
+        """Extract comprehensive material data from all elements.
+        The records of each element are passed to sink as they are created,
+        or collected and returned if no sink is given."""
         material_usage_data = []
+        if sink is None:
+            sink = material_usage_data.extend
         try:
-            elements = FilteredElementCollector(self.doc).WhereElementIsNotElementType().ToElements()
-            self.debug_info['total_elements'] = len(elements)
+            clear_caches()
+            prefetch_elements(FilteredElementCollector(self.doc).OfClass(Material))
+            category_filter = ElementMulticategoryFilter(get_model_category_ids(self.doc))
+            element_ids = list(FilteredElementCollector(self.doc).WherePasses(category_filter).WhereElementIsNotElementType().ToElementIds())
+            total_elements = len(element_ids)
+            self.debug_info['total_elements'] = total_elements
             
             self.output.print_md("## Starting Material Data Collection")
-            self.output.print_md("*Total elements to process:* {}".format(len(elements)))
+            self.output.print_md("*Total elements to process:* {}".format(total_elements))
             
-            for i, element in enumerate(elements):
-                if i % Config.PROGRESS_UPDATE_INTERVAL == 0 or i == len(elements) - 1:
-                    self._update_progress(i + 1, len(elements))
-                
-                element_data = self._process_element(element)
-                if element_data:
-                    material_usage_data.extend(element_data)
-                    self.material_records += len(element_data)
-                    self.debug_info['elements_with_materials'] += 1
+            # Process in blocks so progress is reported once per block
+            block_size = Config.PROGRESS_UPDATE_INTERVAL
+            # Bind the per-element calls locally, they run once per element
+            resolve_block = self._resolve_block
+            process_element = self._process_element
+            debug_info = self.debug_info
+            for block_start in range(0, total_elements, block_size):
+                block_ids = element_ids[block_start:block_start + block_size]
+                get_resolved = resolve_block(block_ids).get
+                for element_id in block_ids:
+                    resolved = get_resolved(element_id.IntegerValue)
+                    # Skip ids that no longer resolve to an element
+                    if resolved is None:
+                        continue
+                    element, type_id = resolved
+                    element_data = process_element(element, type_id)
+                    if element_data:
+                        sink(element_data)
+                        self.material_records += len(element_data)
+                        debug_info['elements_with_materials'] += 1
                 
-                self.processed_elements += 1
+                self.processed_elements += len(block_ids)
+                self._update_progress(self.processed_elements, total_elements)
             
             self._print_completion_stats()
             self._print_debug_info()
@@ -617,7 +784,27 @@ class MaterialDataExtractor:
         except Exception as e:
             raise Exception("Error collecting comprehensive material data: {}".format(str(e)))
 
-    def _process_element(self, element):
+    def _resolve_block(self, element_ids):
+        """Resolve a block of element ids with one collector and prefetch their uncached types.
+        Returns (element, type id value) tuples by element id value, so each element's
+        type id is looked up once here and passed on to the helpers."""
+        resolved = {}
+        type_ids = {}
+        for element in FilteredElementCollector(self.doc, List[ElementId](element_ids)).WhereElementIsNotElementType():
+            type_id = element.GetTypeId()
+            key = type_id.IntegerValue
+            resolved[element.Id.IntegerValue] = (element, key)
+            if key != ElementId.InvalidElementId.IntegerValue and key not in _element_cache:
+                type_ids[key] = type_id
+        if type_ids:
+            types = index_elements(
+                FilteredElementCollector(self.doc, List[ElementId](type_ids.values())).WhereElementIsElementType())
+            # Cache None for type ids the collector did not return, like get_cached_element does
+            for key in type_ids:
+                _element_cache[key] = types.get(key)
+        return resolved
+
+    def _process_element(self, element, type_id):
         """Process a single element and return its material data"""
         try:
             if not element.Category:
@@ -625,89 +812,86 @@ class MaterialDataExtractor:
             
             self.debug_info['elements_with_category'] += 1
             
-            element_info = self._get_element_info(element)
+            material_layers = get_material_layers(element, type_id)
+            
+            if material_layers:
+                self.debug_info['elements_with_layers'] += 1
+            else:
+                # Try fallback method
+                material_layers = self._get_fallback_layers(element, type_id)
+            
+            # Skip the parameter lookups for elements that produce no record
+            if not material_layers and not has_basic_record_category(element):
+                return []
+            
+            element_info = self._get_element_info(element, type_id)
             
-            # Track elements with area/volume for debugging
+            # Track exported elements with area/volume for debugging; elements without
+            # records are skipped above, before their area and volume are looked up
             if element_info['area'] != "N/A":
                 self.debug_info['elements_with_area'] += 1
             if element_info['volume'] != "N/A":
                 self.debug_info['elements_with_volume'] += 1
             
-            material_layers = get_material_layers(element)
-            
             if material_layers:
-                self.debug_info['elements_with_layers'] += 1
                 return self._process_element_layers(element, element_info, material_layers)
-            else:
-                # Try fallback method
-                fallback_data = self._process_element_fallback(element, element_info)
-                if fallback_data:
-                    return fallback_data
-                else:
-                    # Create a basic record even if no materials found
-                    return self._create_basic_element_record(element, element_info)
+            # Create a basic record even if no materials found
+            return self._create_basic_element_record(element, type_id, element_info)
         except Exception as e:
             self.debug_info['errors'] += 1
             print("Error processing element {}: {}".format(element.Id.IntegerValue, str(e)))
             return []
 
-    def _create_basic_element_record(self, element, element_info):
+    def _create_basic_element_record(self, element, type_id, element_info):
         """Create a basic record for elements without specific materials"""
-        try:
-            # Only create records for certain categories that should have materials
-            relevant_categories = [
-                "Walls", "Floors", "Roofs", "Ceilings", "Structural Framing", 
-                "Structural Columns", "Doors", "Windows", "Furniture", "Casework"
-            ]
-            
-            if element.Category and element.Category.Name in relevant_categories:
-                basic_record = {
-                    'ElementId': element_info['element_id'],
-                    'ElementCategory': element_info['category'],
-                    'ExportGUID': element_info['export_guid'],
-                    'FamilyName': element_info['family_name'],
-                    'FamilyType': element_info['family_type'],
-                    'Type': element_info['element_type'],
-                    'TypeId': element_info['type_id'],
-                    'Width_mm': element_info['width'],
-                    'Height_mm': element_info['height'],
-                    'LayerIndex': 0,
-                    'MaterialId': "No_Material",
-                    'MaterialName': "No Material Assigned",
-                    'MaterialClass': "Unknown",
-                    'Thickness_mm': get_element_thickness(element),
-                    'MaterialVolume_m3': "N/A",
-                    'MaterialArea_m2': element_info['area'],
-                    'ElementTotalVolume_m3': element_info['volume'],
-                    'ElementTotalArea_m2': element_info['area']
-                }
-                return [basic_record]
-            return []
-        except:
-            return []
+        # Only create records for certain categories that should have materials
+        if has_basic_record_category(element):
+            basic_record = element_info['columns'] + (
+                0,
+                "No_Material",
+                "No Material Assigned",
+                "Unknown",
+                get_element_thickness(element, type_id),
+                "N/A",
+                element_info['area'],
+                element_info['volume'],
+                element_info['area']
+            )
+            return [basic_record]
+        return []
 
-    def _get_element_info(self, element):
+    def _get_element_info(self, element, type_id):
         """Get common element information using robust parameter access"""
+        family_name, family_type, element_type = get_type_names(element, type_id)
+        volume = get_element_volume_robust(element, type_id)
+        area = get_element_area_robust(element, type_id)
         return {
-            'element_id': element.Id.IntegerValue,
-            'category': element.Category.Name if element.Category else "Unknown",
-            'export_guid': get_export_guid(element),
-            'family_name': get_family_name(element),
-            'family_type': get_family_type(element),
-            'element_type': get_element_type_name(element),
-            'type_id': element.GetTypeId().IntegerValue,
-            'width': get_element_width(element),
-            'height': get_element_height(element),
-            'volume': get_element_volume_robust(element),
-            'area': get_element_area_robust(element)
+            # Record columns shared by every layer of the element, built once
+            'columns': (
+                element.Id.IntegerValue,
+                get_category_name(element),
+                get_export_guid(element),
+                family_name,
+                family_type,
+                element_type,
+                type_id,
+                get_element_width(element, type_id),
+                get_element_height(element, type_id)
+            ),
+            'volume': volume,
+            'area': area,
+            'totals': (format_number(volume), format_number(area)),
+            'area_m2': parse_number(area)
         }
 
     def _process_element_layers(self, element, element_info, material_layers):
         """Process element using material layers"""
         material_records = []
+        # Bind the per-layer calls locally, they run once per layer
+        create_record = self._create_material_record
+        add_record = material_records.append
         for layer in material_layers:
-            material_record = self._create_material_record(element, element_info, layer)
-            material_records.append(material_record)
+            add_record(create_record(element, element_info, layer))
             
             # Track by category materials
             if str(layer.get('MaterialId', '')).startswith('ByCategory'):
@@ -715,52 +899,47 @@ class MaterialDataExtractor:
                 
         return material_records
 
-    def _process_element_fallback(self, element, element_info):
-        """Fallback processing for elements without compound structures"""
-        material_records = []
-        material_ids = get_element_material_ids(element)
+    def _get_fallback_layers(self, element, type_id):
+        """Fallback layer info for elements without compound structures"""
+        fallback_layers = []
+        material_ids = get_element_material_ids(element, type_id)
         
         if material_ids:
             for material_id in material_ids:
-                material = self.doc.GetElement(material_id)
-                if material:
-                    layer_info = {
+                material_info = get_material_info(material_id.IntegerValue)
+                if material_info:
+                    fallback_layers.append({
                         'LayerIndex': 0,
                         'MaterialId': material_id.IntegerValue,
-                        'MaterialName': material.Name if material.Name else "Unnamed Material",
-                        'Thickness_mm': get_material_thickness(element, material_id)
-                    }
-                    material_record = self._create_material_record(element, element_info, layer_info)
-                    material_records.append(material_record)
+                        'MaterialName': material_info[0] if material_info[0] else "Unnamed Material",
+                        'Thickness_mm': get_material_thickness(element, type_id, material_id)
+                    })
         
-        return material_records
+        return fallback_layers
 
     def _create_material_record(self, element, element_info, layer_info):
-        """Create a standardized material record"""
+        """Create a standardized material record as a tuple in CSV_COLUMNS order"""
         thickness = layer_info.get('Thickness_mm', "N/A")
-        material_volume = calculate_layer_volume(element, thickness)
-        material_area = calculate_material_area(element, None)
+        material_volume = calculate_layer_volume(element, thickness, element_info['area_m2'])
+        totals = element_info['totals']
         
-        return {
-            'ElementId': element_info['element_id'],
-            'ElementCategory': element_info['category'],
-            'ExportGUID': element_info['export_guid'],
-            'FamilyName': element_info['family_name'],
-            'FamilyType': element_info['family_type'],
-            'Type': element_info['element_type'],
-            'TypeId': element_info['type_id'],
-            'Width_mm': element_info['width'],
-            'Height_mm': element_info['height'],
-            'LayerIndex': layer_info.get('LayerIndex', 0),
-            'MaterialId': layer_info.get('MaterialId', "N/A"),
-            'MaterialName': layer_info.get('MaterialName', "N/A"),
-            'MaterialClass': self._get_material_class(layer_info),
-            'Thickness_mm': format_number(thickness),
-            'MaterialVolume_m3': format_number(material_volume),
-            'MaterialArea_m2': format_number(material_area),
-            'ElementTotalVolume_m3': format_number(element_info['volume']),
-            'ElementTotalArea_m2': format_number(element_info['area'])
-        }
+        # The material area is the element area, already formatted in the totals
+        return (element_info['columns'] + self._get_layer_columns(layer_info) +
+                (format_number(material_volume), totals[1]) + totals)
+
+    def _get_layer_columns(self, layer_info):
+        """Get the layer columns of a record, shared by all elements of a type with the same layer"""
+        key = (
+            layer_info.get('LayerIndex', 0),
+            layer_info.get('MaterialId', "N/A"),
+            layer_info.get('MaterialName', "N/A"),
+            layer_info.get('Thickness_mm', "N/A")
+        )
+        columns = _layer_columns_cache.get(key)
+        if columns is None:
+            columns = key[:3] + (self._get_material_class(layer_info), format_number(key[3]))
+            _layer_columns_cache[key] = columns
+        return columns
 
     def _get_material_class(self, layer_info):
         """Get material class from layer info with enhanced By Category handling"""
@@ -778,17 +957,25 @@ class MaterialDataExtractor:
             return "No Material"
         else:
             try:
-                material = self.doc.GetElement(ElementId(int(material_id)))
-                return material.MaterialClass if material and hasattr(material, 'MaterialClass') else "Unknown"
-            except:
+                material_info = get_material_info(int(material_id))
+                return material_info[1] if material_info else "Unknown"
+            except (TypeError, ValueError):
                 return "Unknown"
 
     def _update_progress(self, current, total):
-        """Update progress display"""
+        """Update progress display at most once per Config.PROGRESS_MIN_SECONDS,
+        printing a status line only once per 10% of progress"""
+        now = time.time()
+        if current != total and now - self.last_progress_time < Config.PROGRESS_MIN_SECONDS:
+            return
+        self.last_progress_time = now
         progress_percent = int(current * 100 / total)
         self.output.update_progress(current, total)
-        print("Processing element {} of {} ({}%) - {} material records so far".format(
-            current, total, progress_percent, self.material_records))
+        decile = progress_percent // 10
+        if decile != self.reported_decile:
+            self.reported_decile = decile
+            print("Processing element {} of {} ({}%) - {} material records so far".format(
+                current, total, progress_percent, self.material_records))
 
     def _print_completion_stats(self):
         """Print completion statistics"""
@@ -803,132 +990,176 @@ class MaterialDataExtractor:
         self.output.print_md("*Elements with category:* {}".format(self.debug_info['elements_with_category']))
         self.output.print_md("*Elements with materials:* {}".format(self.debug_info['elements_with_materials']))
         self.output.print_md("*Elements with layers:* {}".format(self.debug_info['elements_with_layers']))
-        self.output.print_md("*Elements with area:* {}".format(self.debug_info['elements_with_area']))
-        self.output.print_md("*Elements with volume:* {}".format(self.debug_info['elements_with_volume']))
+        self.output.print_md("*Exported elements with area:* {}".format(self.debug_info['elements_with_area']))
+        self.output.print_md("*Exported elements with volume:* {}".format(self.debug_info['elements_with_volume']))
         self.output.print_md("*By Category materials:* {}".format(self.debug_info['by_category_materials']))
         self.output.print_md("*Processing errors:* {}".format(self.debug_info['errors']))
 
-def save_to_csv(material_data):
-    """Save comprehensive material data to CSV file with semicolon delimiter"""
+# Characters that force a CSV field to be quoted
+CSV_SPECIAL_CHARS = frozenset(Config.CSV_DELIMITER + '"\n\r')
+
+# Columns that only ever hold ids or formatted numbers and never need quoting
+CSV_UNESCAPED_FIELDS = frozenset([
+    'ElementId', 'TypeId', 'LayerIndex', 'Width_mm', 'Height_mm', 'Thickness_mm',
+    'MaterialVolume_m3', 'MaterialArea_m2', 'ElementTotalVolume_m3', 'ElementTotalArea_m2'
+])
+
+def escape_csv_value(value):
+    """Quote a CSV field if it contains the delimiter, quotes or line breaks"""
+    if value is None:
+        return ""
+    value = str(value)
+    if CSV_SPECIAL_CHARS.isdisjoint(value):
+        return value
+    if value.find('"') < 0:
+        return '"' + value + '"'
+    return '"' + value.replace('"', '""') + '"'
+
+def build_record_formatter(columns):
+    """Generate a function that formats a record as one CSV line.
+    Quoting is decided per column up front, so each field is handled inline without a loop."""
+    fields = []
+    for index, column in enumerate(columns):
+        if column in CSV_UNESCAPED_FIELDS:
+            fields.append("record[{}]".format(index))
+        else:
+            fields.append("escape_csv_value(record[{}])".format(index))
+    line_template = Config.CSV_DELIMITER.replace('%', '%%').join(['%s'] * len(columns)) + '\n'
+    source = "def format_record(record):\n    return {!r} % ({},)\n".format(line_template, ", ".join(fields))
+    namespace = {'escape_csv_value': escape_csv_value}
+    exec(source, namespace)
+    return namespace['format_record']
+
+class CsvRecordWriter(object):
+    """Write material records to a CSV file as they are created"""
+    def __init__(self, file_path):
+        self.format_record = build_record_formatter(CSV_COLUMNS)
+        self.record_count = 0
+        self.pending_lines = []
+        # UTF-8 with BOM so Excel shows non-ASCII material names correctly
+        self.writer = StreamWriter(file_path, False, Encoding.UTF8, Config.CSV_BUFFER_SIZE)
+        self.writer.Write(Config.CSV_DELIMITER.join(CSV_COLUMNS) + '\n')
+
+    def write_records(self, materials):
+        # Formatted lines are collected and written in batches to keep interop calls down
+        self.pending_lines.extend(map(self.format_record, materials))
+        self.record_count += len(materials)
+        if len(self.pending_lines) >= Config.CSV_WRITE_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.pending_lines:
+            self.writer.Write(''.join(self.pending_lines))
+            self.pending_lines = []
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.writer.Close()
+
+def ask_csv_file_path():
+    """Ask the user where to save the CSV file, returns None if cancelled"""
+    save_dialog = SaveFileDialog()
+    save_dialog.Filter = "CSV files (*.csv)|*.csv|All files (*.*)|*.*"
+    save_dialog.FilterIndex = 1
+    save_dialog.RestoreDirectory = True
+    
     try:
-        save_dialog = SaveFileDialog()
-        save_dialog.Filter = "CSV files (*.csv)|*.csv|All files (*.*)|*.*"
-        save_dialog.FilterIndex = 1
-        save_dialog.RestoreDirectory = True
+        initial_dir = os.path.join(os.path.expanduser("~"), "Documents")
+        if os.path.exists(initial_dir):
+            save_dialog.InitialDirectory = initial_dir
+    except (OSError, IOError):
+        pass
         
+    save_dialog.FileName = "ESG_Material_Export_{}".format(datetime.now().strftime(Config.FILE_TIMESTAMP_FORMAT))
+    
+    if save_dialog.ShowDialog() == DialogResult.OK:
+        return save_dialog.FileName
+    return None
+
+def replace_file(source_path, target_path):
+    """Move a file to target_path, replacing any existing file there"""
+    if File.Exists(target_path):
+        File.Replace(source_path, target_path, None)
+    else:
+        File.Move(source_path, target_path)
+
+def save_to_csv(extractor, file_path):
+    """Stream the extracted material data to a CSV file with semicolon delimiter.
+    The records are written to a temporary file next to file_path, which only
+    replaces file_path once the export succeeded with at least one record."""
+    temp_path = file_path + ".tmp"
+    try:
+        csv_writer = CsvRecordWriter(temp_path)
+    except Exception as e:
+        raise Exception("Error saving CSV file: {}".format(str(e)))
+    
+    output.print_md("## Writing CSV File...")
+    try:
         try:
-            initial_dir = os.path.join(os.path.expanduser("~"), "Documents")
-            if os.path.exists(initial_dir):
-                save_dialog.InitialDirectory = initial_dir
-        except:
-            pass
-            
-        save_dialog.FileName = "ESG_Material_Export_{}".format(Config.get_timestamp())
-        
-        dialog_result = save_dialog.ShowDialog()
+            extractor.extract_all_materials(csv_writer.write_records)
+        finally:
+            csv_writer.close()
         
-        if dialog_result == DialogResult.OK:
-            file_path = save_dialog.FileName
-            output.print_md("## Writing CSV File...")
-            print("Writing {} material records to CSV...".format(len(material_data)))
-            
-            # Use binary mode for Python 2.7 compatibility
-            with open(file_path, 'wb') as csvfile:
-                if material_data:
-                    fieldnames = material_data[0].keys()
-                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames,
-                                          delimiter=Config.CSV_DELIMITER, 
-                                          lineterminator='\n')
-                    writer.writeheader()
-                    
-                    for i, material in enumerate(material_data):
-                        if i % Config.CSV_WRITE_INTERVAL == 0:
-                            progress_percent = int((i + 1) * 100 / len(material_data))
-                            print("Writing record {} of {} ({}%)".format(i + 1, len(material_data), progress_percent))
-                        writer.writerow(material)
-                else:
-                    writer = csv.writer(csvfile, delimiter=Config.CSV_DELIMITER, 
-                                      lineterminator='\n')
-                    headers = [
-                        'ElementId', 'ElementCategory', 'ExportGUID', 'FamilyName', 'FamilyType', 'Type', 'TypeId',
-                        'Width_mm', 'Height_mm', 'LayerIndex',
-                        'MaterialId', 'MaterialName', 'MaterialClass',
-                        'Thickness_mm', 'MaterialVolume_m3', 'MaterialArea_m2',
-                        'ElementTotalVolume_m3', 'ElementTotalArea_m2'
-                    ]
-                    writer.writerow(headers)
-            
+        # Don't replace the chosen file with a header-only file
+        if csv_writer.record_count:
+            replace_file(temp_path, file_path)
             output.print_md("## CSV Export Complete!")
-            return file_path, len(material_data)
-        else:
-            return None, 0
-            
-    except Exception as e:
-        raise Exception("Error saving CSV file: {}".format(str(e)))
+    finally:
+        # Left behind on failure or when there were no records
+        File.Delete(temp_path)
+    return csv_writer.record_count
 
 def main():
     """Main function that runs when the button is clicked"""
     try:
-        result = MessageBox.Show(
-            "This will generate a comprehensive material list export for ESG/CO2 analysis.\n\nDo you want to proceed?",
-            "Export ESG Material Data",
-            MessageBoxButtons.YesNo,
-            MessageBoxIcon.Question
-        )
-        
-        if result == DialogResult.Yes:
-            start_time = time.time()
-            
-            output.close_others()
-            output.print_md("# ESG Material Data Export (Enhanced By Category Handling)")
-            output.print_md("*Started:* {}".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-            
-            extractor = MaterialDataExtractor(doc, output)
-            material_data = extractor.extract_all_materials()
-            
-            if not material_data:
-                MessageBox.Show(
-                    "No materials found in the current model.\n\nPlease check the debug information in the output window.", 
-                    "No Data",
-                    MessageBoxButtons.OK, 
-                    MessageBoxIcon.Warning
-                )
-                return
-            
-            file_path, count = save_to_csv(material_data)
-            
-            end_time = time.time()
-            elapsed_time = round(end_time - start_time, 2)
-            
-            if file_path:
-                output.print_md("## Export Results")
-                output.print_md("*File:* {}".format(file_path))
-                output.print_md("*Records:* {}".format(count))
-                output.print_md("*Time:* {} seconds".format(elapsed_time))
-                
-                MessageBox.Show(
-                    "Export completed successfully!\n\n" +
-                    "Material records exported: {}\n".format(count) +
-                    "Processing time: {} seconds\n".format(elapsed_time) +
-                    "File saved to:\n{}".format(file_path),
-                    "Export Success", 
-                    MessageBoxButtons.OK, 
-                    MessageBoxIcon.Information
-                )
-            else:
-                MessageBox.Show(
-                    "Export cancelled - no file was saved.", 
-                    "Export Cancelled",
-                    MessageBoxButtons.OK, 
-                    MessageBoxIcon.Information
-                )
-        else:
+        # The save dialog doubles as the confirmation to start the export
+        file_path = ask_csv_file_path()
+        if not file_path:
             MessageBox.Show(
-                "Export cancelled by user.", 
+                "Export cancelled - no file was saved.", 
                 "Export Cancelled",
                 MessageBoxButtons.OK, 
                 MessageBoxIcon.Information
             )
+            return
+        
+        start_time = time.time()
+        
+        output.close_others()
+        output.print_md("# ESG Material Data Export (Enhanced By Category Handling)")
+        output.print_md("*Started:* {}".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        
+        extractor = MaterialDataExtractor(doc, output)
+        count = save_to_csv(extractor, file_path)
+        
+        if not count:
+            MessageBox.Show(
+                "No materials found in the current model.\n\nPlease check the debug information in the output window.", 
+                "No Data",
+                MessageBoxButtons.OK, 
+                MessageBoxIcon.Warning
+            )
+            return
+        
+        end_time = time.time()
+        elapsed_time = round(end_time - start_time, 2)
+        
+        output.print_md("## Export Results")
+        output.print_md("*File:* {}".format(file_path))
+        output.print_md("*Records:* {}".format(count))
+        output.print_md("*Time:* {} seconds".format(elapsed_time))
+        
+        MessageBox.Show(
+            "Export completed successfully!\n\n" +
+            "Material records exported: {}\n".format(count) +
+            "Processing time: {} seconds\n".format(elapsed_time) +
+            "File saved to:\n{}".format(file_path),
+            "Export Success", 
+            MessageBoxButtons.OK, 
+            MessageBoxIcon.Information
+        )
             
     except Exception as e:
         error_msg = "An error occurred during export:\n\n{}".format(str(e))